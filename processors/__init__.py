@@ -3,4 +3,4 @@
 Keep file-processing logic (move, clean, validate) here so the watcher remains small and testable.
 """
 
-__all__ = ["file_processor"]
+__all__ = ["batch", "event_queue", "fanotify_source", "file_processor", "specialize"]
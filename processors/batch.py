@@ -0,0 +1,99 @@
+"""Batched file processing for FolderWatcher.
+
+`BatchProcessor` takes completed paths from the watcher's event thread and moves
+them on a background worker. Paths that arrive together (archive unpacks, rsync
+drops) are grouped so a burst shares one `processed_dir` snapshot, read only
+once something in the burst collides, instead of probing the filesystem once
+per colliding file.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Optional
+
+from processors.file_processor import _NameSet
+from processors.specialize import build_processor
+
+_STOP = object()
+
+
+class BatchProcessor:
+    """Move submitted paths into `processed_dir` on a background thread.
+
+    - `window` is how long (seconds) to keep collecting after the first path of a batch.
+    - `max_batch` caps how many paths share one directory snapshot.
+    - `dedup` is passed through to the processor (see `process_new_file`).
+    - Errors are logged per file and never stop the worker.
+    """
+
+    def __init__(
+        self,
+        processed_dir: str,
+        logger: Optional[object] = None,
+        window: float = 0.01,
+        max_batch: int = 32,
+        dedup: bool = False,
+    ) -> None:
+        self.processed_dir = processed_dir
+        self.logger = logger
+        self.window = window
+        self.max_batch = max_batch
+        self.dedup = dedup
+        self._proc = build_processor(processed_dir, dedup=dedup)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="fw-batch", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str) -> None:
+        """Queue `path` for processing and return immediately."""
+        self._queue.put(path)
+
+    def close(self) -> None:
+        """Process everything already submitted, then stop the worker."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+
+    def _process(self, batch: list[str]) -> None:
+        # Moves refuse to replace, so the directory is only scanned on the first
+        # collision; the snapshot is then shared by the rest of the batch
+        existing = _NameSet(scanned=False) if len(batch) > 1 else None
+
+        for path in batch:
+            try:
+                dest = self._proc(path, self.logger, existing)
+            except Exception:
+                self._log("exception", "Error processing file %s", path)
+            else:
+                self._log("info", "Processed file: %s", dest)
+
+    def _log(self, level: str, msg: str, *args) -> None:
+        if self.logger:
+            try:
+                getattr(self.logger, level)(msg, *args)
+            except Exception:
+                # Keep processing tolerant to logger failures
+                pass
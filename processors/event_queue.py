@@ -0,0 +1,211 @@
+"""Settle tracking for many pending files at once.
+
+Instead of sleeping in the event callback for every new file, `SettlePoller`
+keeps all pending paths in an `EventBatch` and samples their sizes together on
+one background thread. The batch is stored column-wise (parallel `array`s of
+fds, sizes and counters) so each poll is a linear sweep over packed integers.
+Up to `max_fds` files are opened once and sampled with fstat, so their polls
+skip path resolution; the rest are sampled with a path stat.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Pending files sampled through an open fd; beyond this a burst falls back to path
+# stats rather than exhaust the process's fd limit (256 by default on macOS).
+# An open handle on Windows blocks the producer from renaming or deleting the
+# file, so there every sample is a path stat.
+_MAX_FDS = 0 if os.name == "nt" else 64
+
+
+def _open_for_stat(path: str) -> int:
+    """Open `path` read-only for fstat polling; return -1 if it can't be opened yet."""
+    noatime = getattr(os, "O_NOATIME", 0)
+    try:
+        return os.open(path, os.O_RDONLY | noatime)
+    except PermissionError:
+        # O_NOATIME is only allowed for the file's owner
+        if not noatime:
+            return -1
+    except OSError:
+        return -1
+    try:
+        return os.open(path, os.O_RDONLY)
+    except OSError:
+        return -1
+
+
+@dataclass
+class EventBatch:
+    """Pending paths and their settle state, one column per field."""
+
+    paths: list[str] = field(default_factory=list)
+    # Open fd per path for fstat sampling, -1 until the file can be opened
+    fds: array = field(default_factory=lambda: array("i"))
+    prev_sizes: array = field(default_factory=lambda: array("q"))
+    curr_sizes: array = field(default_factory=lambda: array("q"))
+    # Length of the current run of equal, valid size readings
+    runs: array = field(default_factory=lambda: array("i"))
+    polls: array = field(default_factory=lambda: array("i"))
+    max_fds: int = _MAX_FDS
+    # Number of entries in `fds` that are open
+    held: int = 0
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def add(self, path: str) -> None:
+        self.paths.append(path)
+        self.fds.append(-1)
+        self.prev_sizes.append(-1)
+        self.curr_sizes.append(-1)
+        self.runs.append(0)
+        self.polls.append(0)
+
+    def poll(self, samples: int, max_tries: int) -> tuple[list[str], list[str]]:
+        """Sample every pending size once and return `(settled, gave_up)` paths.
+
+        A path settles after `samples` consecutive equal readings and is given up
+        on after `max_tries` readings. Both kinds are removed from the batch.
+        """
+        paths, fds, curr = self.paths, self.fds, self.curr_sizes
+        for i, path in enumerate(paths):
+            fd = fds[i]
+            if fd < 0:
+                if self.held >= self.max_fds:
+                    try:
+                        curr[i] = os.stat(path).st_size
+                    except OSError:
+                        curr[i] = -1
+                    continue
+                fd = fds[i] = _open_for_stat(path)
+                if fd < 0:
+                    curr[i] = -1
+                    continue
+                self.held += 1
+            try:
+                st = os.fstat(fd)
+            except OSError:
+                st = None
+            if st is None or st.st_nlink == 0:
+                # Deleted or replaced since it was opened; reopen by path next poll
+                os.close(fd)
+                self.held -= 1
+                fds[i] = -1
+                curr[i] = -1
+            else:
+                curr[i] = st.st_size
+
+        prev, runs, polls = self.prev_sizes, self.runs, self.polls
+        settled: list[str] = []
+        gave_up: list[str] = []
+        keep: list[int] = []
+        for i, (c, p) in enumerate(zip(curr, prev)):
+            runs[i] = runs[i] + 1 if c == p and c >= 0 else (1 if c >= 0 else 0)
+            polls[i] += 1
+            if runs[i] >= samples:
+                settled.append(paths[i])
+            elif polls[i] >= max_tries:
+                gave_up.append(paths[i])
+            else:
+                keep.append(i)
+
+        if len(keep) != len(paths):
+            kept = set(keep)
+            for i, fd in enumerate(fds):
+                if fd >= 0 and i not in kept:
+                    os.close(fd)
+                    self.held -= 1
+            self.paths = [paths[i] for i in keep]
+            self.fds = array("i", (fds[i] for i in keep))
+            self.curr_sizes = array("q", (curr[i] for i in keep))
+            self.runs = array("i", (runs[i] for i in keep))
+            self.polls = array("i", (polls[i] for i in keep))
+        self.prev_sizes = array("q", self.curr_sizes)
+        return settled, gave_up
+
+
+class SettlePoller:
+    """Poll pending files every `settle_seconds` and report them once settled.
+
+    `on_ready(path, stable)` is called from the poller thread with `stable=True`
+    for settled files and `stable=False` for files that never stopped changing.
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[str, bool], None],
+        settle_seconds: float = 0.5,
+        max_tries: int = 10,
+        settle_samples: int = 2,
+    ) -> None:
+        self.on_ready = on_ready
+        self.settle_seconds = settle_seconds
+        self.max_tries = max_tries
+        self.settle_samples = max(2, settle_samples)
+        # Owned by the poller thread; add() only appends to _incoming under the lock
+        self._batch = EventBatch()
+        self._incoming: list[str] = []
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="fw-settle", daemon=True)
+        self._thread.start()
+
+    def add(self, path: str) -> None:
+        """Start tracking `path`; repeated events for a pending path are ignored."""
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+            self._incoming.append(path)
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """Finish settling the files already added, then stop the thread."""
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        batch = self._batch
+        while True:
+            with self._lock:
+                incoming, self._incoming = self._incoming, []
+            for path in incoming:
+                batch.add(path)
+            if not batch:
+                if self._stopping:
+                    return
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            # Sample outside the lock so add() never waits behind the fstat sweep
+            settled, gave_up = batch.poll(self.settle_samples, self.max_tries)
+            if settled or gave_up:
+                with self._lock:
+                    self._pending.difference_update(settled)
+                    self._pending.difference_update(gave_up)
+
+            for path in settled:
+                self._dispatch(path, True)
+            for path in gave_up:
+                self._dispatch(path, False)
+
+            # Sleep between samples, mirroring the inline settle loop
+            if batch:
+                time.sleep(self.settle_seconds)
+
+    def _dispatch(self, path: str, stable: bool) -> None:
+        try:
+            self.on_ready(path, stable)
+        except Exception:
+            # on_ready does its own logging; never let one file stop the poller
+            pass
@@ -0,0 +1,137 @@
+"""Close-write notifications for one directory via Linux fanotify.
+
+`FanotifySource` puts a single inode mark on the watched directory with
+`FAN_EVENT_ON_CHILD`, so the kernel only reports files closed after writing
+directly inside it. Events come with an open fd to the written file, which is
+resolved to a path.
+
+Files renamed into the directory are not reported: FAN_MOVED_TO needs FID
+reporting (FAN_REPORT_FID), whose events carry file handles instead of fds.
+
+fanotify needs CAP_SYS_ADMIN; constructing a source raises PermissionError
+without it.
+"""
+from __future__ import annotations
+
+import ctypes
+import errno
+import os
+import select
+import struct
+from typing import Optional
+
+FAN_CLOEXEC = 0x00000001
+FAN_NONBLOCK = 0x00000002
+FAN_CLASS_NOTIF = 0x00000000
+FAN_MARK_ADD = 0x00000001
+FAN_MARK_ONLYDIR = 0x00000008
+FAN_CLOSE_WRITE = 0x00000008
+FAN_EVENT_ON_CHILD = 0x08000000
+FAN_Q_OVERFLOW = 0x00004000
+FAN_NOFD = -1
+AT_FDCWD = -100
+
+# struct fanotify_event_metadata: event_len, vers, reserved, metadata_len, mask, fd, pid
+_METADATA = struct.Struct("=IBBHQii")
+_METADATA_VERSION = 3
+_READ_SIZE = 64 * 1024
+
+try:
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (OSError, TypeError):  # no process-wide libc handle (e.g. Windows)
+    _libc = None
+
+
+def _check(result: int, what: str, path: Optional[str] = None) -> int:
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"{what}: {os.strerror(err)}", path)
+    return result
+
+
+def fanotify_supported() -> bool:
+    """Return True if this libc exposes the fanotify calls."""
+    return _libc is not None and hasattr(_libc, "fanotify_init") and hasattr(_libc, "fanotify_mark")
+
+
+class FanotifySource:
+    """Yield paths of files closed after writing directly inside `watch_path`."""
+
+    def __init__(self, watch_path: str) -> None:
+        if not fanotify_supported():
+            raise OSError(errno.ENOSYS, "fanotify is not available on this system")
+        # Event fds resolve to canonical paths, so compare against the canonical watch dir
+        self.watch_path = os.path.realpath(watch_path)
+
+        init = _libc.fanotify_init
+        init.argtypes = [ctypes.c_uint, ctypes.c_uint]
+        init.restype = ctypes.c_int
+        mark = _libc.fanotify_mark
+        mark.argtypes = [ctypes.c_int, ctypes.c_uint, ctypes.c_uint64, ctypes.c_int, ctypes.c_char_p]
+        mark.restype = ctypes.c_int
+
+        self._fd = _check(
+            init(FAN_CLASS_NOTIF | FAN_CLOEXEC | FAN_NONBLOCK, os.O_RDONLY | os.O_CLOEXEC | getattr(os, "O_LARGEFILE", 0)),
+            "fanotify_init",
+        )
+        try:
+            # A directory mark keeps writes elsewhere on the filesystem out of the queue
+            _check(
+                mark(self._fd, FAN_MARK_ADD | FAN_MARK_ONLYDIR, FAN_CLOSE_WRITE | FAN_EVENT_ON_CHILD, AT_FDCWD, os.fsencode(self.watch_path)),
+                "fanotify_mark",
+                self.watch_path,
+            )
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._poll = select.poll()
+        self._poll.register(self._fd, select.POLLIN)
+
+    def read(self, timeout: Optional[float] = None) -> list[str]:
+        """Wait up to `timeout` seconds and return the completed files reported so far."""
+        if not self._poll.poll(None if timeout is None else int(timeout * 1000)):
+            return []
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + _METADATA.size <= len(data):
+            event_len, vers, _, _, mask, fd, _pid = _METADATA.unpack_from(data, offset)
+            if event_len < _METADATA.size:
+                # Malformed; there is no way to find the next event
+                break
+            offset += event_len
+            if fd == FAN_NOFD:
+                continue
+            if vers != _METADATA_VERSION or mask & FAN_Q_OVERFLOW:
+                # Still close the fd the kernel opened for this event
+                os.close(fd)
+                continue
+            try:
+                path = self._resolve(fd)
+            finally:
+                os.close(fd)
+            if path is not None:
+                paths.append(path)
+        return paths
+
+    def _resolve(self, fd: int) -> Optional[str]:
+        try:
+            if os.fstat(fd).st_nlink == 0:
+                # Written and already deleted
+                return None
+            path = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            return None
+        if os.path.dirname(path) != self.watch_path:
+            # Renamed out of the watched dir before the event was read
+            return None
+        return path
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
@@ -7,33 +7,388 @@ Extend this file to add cleaning, validation, parsing, or upload logic.
 """
 from __future__ import annotations
 
+import ctypes
+import errno
+import hashlib
+import json
+import mmap
 import os
 import shutil
+import sys
+import threading
 from typing import Optional
 
+# Chunk size for the in-kernel copy used when a rename crosses filesystems
+_COPY_CHUNK = 8 * 1024 * 1024
 
-def process_new_file(path: str, processed_dir: str, logger: Optional[object] = None) -> str:
+# Mirror shutil: sendfile() only accepts a regular file as the output fd on Linux
+_USE_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+# copy_file_range() (Linux, Python 3.8+) can reflink on btrfs/xfs; these errors mean "not here"
+_USE_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+_COPY_FILE_RANGE_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+
+# renameat2(2) flag: fail with EEXIST instead of replacing an existing target
+_AT_FDCWD = -100
+_RENAME_NOREPLACE = 1
+
+
+def _load_renameat2():
+    """Return libc's renameat2 (glibc >= 2.28), or None where it isn't available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+_renameat2 = _load_renameat2()
+
+# Content index used by dedup mode: one JSON object per line in processed_dir
+_DEDUP_INDEX = ".dedup.jsonl"
+_dedup_indexes: dict[str, dict[str, dict]] = {}
+_dedup_lock = threading.Lock()
+
+# Directories already created by _ensure_dir; processed_dir is fixed per watcher run
+_ensured_dirs: set[str] = set()
+_ensured_lock = threading.Lock()
+
+
+def _ensure_dir(directory: str) -> None:
+    """Create `directory` once; later calls are a set lookup."""
+    if directory in _ensured_dirs:
+        return
+    with _ensured_lock:
+        if directory not in _ensured_dirs:
+            os.makedirs(directory, exist_ok=True)
+            _ensured_dirs.add(directory)
+
+
+def _kernel_copy(src_fd: int, dst_fd: int, size: int) -> int:
+    """Copy the first `size` bytes of `src_fd` into `dst_fd` without a userspace buffer.
+
+    Prefers copy_file_range (a metadata-only clone on CoW filesystems) and
+    falls back to a sendfile loop where the kernel can't do that. Returns the
+    number of bytes copied, which is short of `size` only if the source shrank.
+    """
+    offset = 0
+    if _USE_COPY_FILE_RANGE:
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dst_fd, min(size - offset, _COPY_CHUNK), offset, offset)
+                if copied == 0:
+                    # Some filesystems report 0 without copying anything; like
+                    # CPython, treat that as "unsupported" rather than EOF
+                    break
+                offset += copied
+        except OSError as exc:
+            if exc.errno not in _COPY_FILE_RANGE_UNSUPPORTED:
+                raise
+        if offset >= size:
+            return offset
+        # copy_file_range used explicit offsets; sendfile writes at the fd position
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+
+    while offset < size:
+        sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, _COPY_CHUNK))
+        if sent == 0:
+            break
+        offset += sent
+    return offset
+
+
+def _copy_then_unlink(src: str, dst: str) -> None:
+    """Copy `src` to a new file `dst` (preserving mode and mtime), then remove `src`."""
+    if not _USE_SENDFILE:
+        # Exclusive create, like the sendfile path, so an existing dst is never replaced
+        with open(src, "rb") as fsrc, open(dst, "xb") as fdst:
+            try:
+                shutil.copyfileobj(fsrc, fdst, _COPY_CHUNK)
+            except BaseException:
+                fdst.close()
+                os.unlink(dst)
+                raise
+        shutil.copystat(src, dst)
+        os.unlink(src)
+        return
+
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        st = os.fstat(src_fd)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            copied = _kernel_copy(src_fd, dst_fd, st.st_size)
+            if copied != st.st_size:
+                # Never unlink the source unless the copy is complete
+                raise OSError(errno.EIO, f"Short copy ({copied} of {st.st_size} bytes)", src)
+            os.fchmod(dst_fd, st.st_mode & 0o7777)
+            os.fsync(dst_fd)
+        except BaseException:
+            os.close(dst_fd)
+            os.unlink(dst)
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+    os.unlink(src)
+
+
+def _rename_noreplace(src: str, dst: str) -> Optional[bool]:
+    """Rename `src` to `dst` in one step unless `dst` exists.
+
+    Returns True if renamed, False if `dst` already exists, and None when the
+    platform (or filesystem) offers no atomic no-replace rename.
+    """
+    if _renameat2 is not None:
+        if _renameat2(_AT_FDCWD, os.fsencode(src), _AT_FDCWD, os.fsencode(dst), _RENAME_NOREPLACE) == 0:
+            return True
+        err = ctypes.get_errno()
+        if err == errno.EEXIST:
+            return False
+        if err in (errno.EINVAL, errno.ENOSYS):
+            # Kernel or filesystem doesn't support RENAME_NOREPLACE
+            return None
+        raise OSError(err, os.strerror(err), src, None, dst)
+
+    if sys.platform == "win32":
+        # os.rename never replaces an existing file on Windows
+        try:
+            os.rename(src, dst)
+        except FileExistsError:
+            return False
+        return True
+
+    return None
+
+
+def _move(src: str, dst: str) -> bool:
+    """Move `src` to `dst` without replacing an existing file.
+
+    Renames in place when possible and copies only when crossing filesystems.
+    Returns False, leaving `src` untouched, if `dst` already exists.
+    """
+    try:
+        moved = _rename_noreplace(src, dst)
+        if moved is None:
+            if os.path.exists(dst):
+                return False
+            os.rename(src, dst)
+            moved = True
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+        try:
+            _copy_then_unlink(src, dst)
+        except FileExistsError:
+            return False
+        moved = True
+    return moved
+
+
+def _move_into(src: str, processed_dir: str, dst: str) -> bool:
+    """`_move`, recreating `processed_dir` if it was removed after being cached."""
+    try:
+        return _move(src, dst)
+    except FileNotFoundError:
+        if not os.path.exists(src):
+            raise
+        _ensured_dirs.discard(processed_dir)
+        _ensure_dir(processed_dir)
+        return _move(src, dst)
+
+
+class _NameSet(set):
+    """Snapshot of a directory's entry names that remembers suffix searches.
+
+    Names are only ever added while a snapshot is in use, so once `-1`..`-N`
+    have been found taken for a base name they stay taken. Later searches for
+    the same base resume after the last suffix handed out instead of rescanning
+    from 1, which keeps a burst of N same-named files linear rather than
+    quadratic.
+
+    A snapshot created with `scanned=False` starts out holding only the names
+    added to it and reads the directory on the first collision, so a batch
+    that never collides never pays for a scan.
+    """
+
+    __slots__ = ("suffix_hints", "scanned")
+
+    def __init__(self, names=(), scanned: bool = True) -> None:
+        super().__init__(names)
+        self.suffix_hints: dict[tuple[str, str], int] = {}
+        self.scanned = scanned
+
+
+def _existing_names(directory: str) -> _NameSet:
+    """Return the set of entry names currently in `directory`."""
+    with os.scandir(directory) as it:
+        return _NameSet(entry.name for entry in it)
+
+
+def _scan_into(names: _NameSet, directory: str) -> None:
+    """Fill a `scanned=False` snapshot with the entries of `directory`."""
+    with os.scandir(directory) as it:
+        names.update(entry.name for entry in it)
+    names.scanned = True
+
+
+def _next_free_suffix(names: set[str], base: str, ext: str) -> int:
+    """Return the first `i >= 1` for which `f"{base}-{i}{ext}"` is not in `names`."""
+    hints = getattr(names, "suffix_hints", None)
+    i = hints.get((base, ext), 1) if hints is not None else 1
+    prefix = base + "-"
+    while prefix + str(i) + ext in names:
+        i += 1
+    if hints is not None:
+        # The returned name is about to be added, so resume after it next time
+        hints[(base, ext)] = i + 1
+    return i
+
+
+def _file_digest(path: str) -> str:
+    """Return the SHA-256 hex digest of `path`, hashing straight from an mmap."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap can't map an empty file
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return hashlib.sha256(m).hexdigest()
+
+
+def _dedup_index(processed_dir: str) -> dict[str, dict]:
+    """Return the digest index for `processed_dir`, loading the sidecar on first use."""
+    index = _dedup_indexes.get(processed_dir)
+    if index is None:
+        index = {}
+        try:
+            with open(os.path.join(processed_dir, _DEDUP_INDEX), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        index[entry["sha256"]] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # Skip a torn or hand-edited line rather than lose the whole index
+                        continue
+        except FileNotFoundError:
+            pass
+        _dedup_indexes[processed_dir] = index
+    return index
+
+
+def _find_duplicate(processed_dir: str, digest: str) -> Optional[str]:
+    """Return the path of an unchanged processed file with `digest`, if any."""
+    with _dedup_lock:
+        entry = _dedup_index(processed_dir).get(digest)
+    if entry is None:
+        return None
+    known = os.path.join(processed_dir, entry["name"])
+    try:
+        st = os.stat(known)
+    except OSError:
+        return None
+    # Only trust the digest while the file is exactly as it was recorded
+    if st.st_size != entry.get("size") or st.st_mtime_ns != entry.get("mtime_ns"):
+        return None
+    return known
+
+
+def _record_digest(processed_dir: str, digest: str, dest: str) -> None:
+    st = os.stat(dest)
+    entry = {"sha256": digest, "name": os.path.basename(dest), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    with _dedup_lock:
+        _dedup_index(processed_dir)[digest] = entry
+        # Append-only, so recording a file never rewrites the whole index
+        with open(os.path.join(processed_dir, _DEDUP_INDEX), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def _split_ext(name: str) -> tuple[str, str]:
+    """Split a bare file name like os.path.splitext: leading dots never start an extension."""
+    dot = name.rfind(".")
+    if dot < len(name) - len(name.lstrip(".")):
+        return name, ""
+    return name[:dot], name[dot:]
+
+
+def process_new_file(
+    path: str,
+    processed_dir: str,
+    logger: Optional[object] = None,
+    existing: Optional[set[str]] = None,
+    dedup: bool = False,
+) -> str:
     """Move `path` into `processed_dir` and return the destination path.
 
     - Creates `processed_dir` if needed.
     - Avoids overwriting existing files by adding a numeric suffix when necessary.
+    - Renames in place when possible; copies only when crossing filesystems.
     - Logs via `logger` if provided.
+
+    `existing` is an optional snapshot of the names in `processed_dir` shared by
+    callers moving several files at once; it is used to pick candidate names
+    and updated with the chosen one. A stale snapshot is safe: the move itself
+    never replaces an existing file. An unscanned `_NameSet` is filled on the
+    first collision and reused by later calls.
+
+    With `dedup`, a file whose content matches one already processed is
+    removed instead of moved, and the earlier destination is returned.
     """
-    os.makedirs(processed_dir, exist_ok=True)
-    dest = os.path.join(processed_dir, os.path.basename(path))
+    _ensure_dir(processed_dir)
+
+    digest = None
+    if dedup:
+        digest = _file_digest(path)
+        duplicate = _find_duplicate(processed_dir, digest)
+        if duplicate is not None:
+            os.unlink(path)
+            if logger:
+                try:
+                    logger.info("Removed duplicate of %s: %s", duplicate, path)
+                except Exception:
+                    # Keep processing tolerant to logger failures
+                    pass
+            return duplicate
+
+    # Watcher paths are plain OS paths, so a split on the separator(s) is enough
+    name = path.rpartition(os.sep)[2]
+    if os.altsep:
+        name = name.rpartition(os.altsep)[2]
+    dest = os.path.join(processed_dir, name)
+
+    # Try the plain name first; the move itself refuses to overwrite, so no
+    # separate existence check is needed.
+    if existing is None or name not in existing:
+        moved = _move_into(path, processed_dir, dest)
+    else:
+        moved = False
 
-    # Avoid overwrite by adding numeric suffix
-    if os.path.exists(dest):
-        base, ext = os.path.splitext(dest)
-        i = 1
+    # Avoid overwrite by adding numeric suffix. One directory snapshot replaces
+    # a stat() per candidate when many duplicates already exist.
+    if not moved:
+        if existing is None:
+            existing = _existing_names(processed_dir)
+        elif not getattr(existing, "scanned", True):
+            _scan_into(existing, processed_dir)
+        existing.add(name)
+        base, ext = _split_ext(name)
         while True:
-            candidate = f"{base}-{i}{ext}"
-            if not os.path.exists(candidate):
-                dest = candidate
+            name = f"{base}-{_next_free_suffix(existing, base, ext)}{ext}"
+            dest = os.path.join(processed_dir, name)
+            if _move_into(path, processed_dir, dest):
                 break
-            i += 1
+            # Another writer took this name since the snapshot; try the next one
+            existing.add(name)
 
-    shutil.move(path, dest)
+    if existing is not None:
+        existing.add(name)
+    if digest is not None:
+        _record_digest(processed_dir, digest, dest)
 
     if logger:
         try:
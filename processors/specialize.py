@@ -0,0 +1,73 @@
+"""Processors specialised for a fixed processed directory.
+
+`processed_dir` never changes during a watcher run, so `build_processor` binds
+it (already joined with the separator) and every helper the common path needs
+as default arguments. The returned function then resolves everything through
+fast locals: split the name, one no-replace move, log. The move copies across
+filesystems itself (see `_move`); collisions, a missing `processed_dir` and
+dedup go through `process_new_file`.
+"""
+from __future__ import annotations
+
+import functools
+import os
+from typing import Callable, Optional
+
+from processors.file_processor import _NameSet, _move, process_new_file
+
+
+def build_processor(processed_dir: str, dedup: bool = False) -> Callable[..., str]:
+    """Return `proc(path, logger=None, existing=None) -> dest` for `processed_dir`.
+
+    Behaves exactly like `process_new_file(path, processed_dir, logger, existing)`.
+    """
+    if dedup:
+        # Every file has to be hashed first, so there is no cheaper common path
+        return functools.partial(_call_with_dir, processed_dir=processed_dir, dedup=True)
+
+    def proc(
+        path: str,
+        logger: Optional[object] = None,
+        existing: Optional[set[str]] = None,
+        _prefix: str = os.path.join(processed_dir, ""),
+        _sep: str = os.sep,
+        _altsep: Optional[str] = os.altsep,
+        _move=_move,
+        _NameSet=_NameSet,
+        _fallback=process_new_file,
+        _processed_dir: str = processed_dir,
+    ) -> str:
+        name = path.rpartition(_sep)[2]
+        if _altsep:
+            name = name.rpartition(_altsep)[2]
+        if existing is None or name not in existing:
+            dest = _prefix + name
+            try:
+                moved = _move(path, dest)
+            except FileNotFoundError:
+                # processed_dir not created yet (or removed), or the source is gone;
+                # the general path creates the directory or raises as appropriate
+                moved = None
+            if moved:
+                if existing is not None:
+                    existing.add(name)
+                if logger:
+                    try:
+                        logger.info("Moved file to processed dir: %s", dest)
+                    except Exception:
+                        # Keep processing tolerant to logger failures
+                        pass
+                return dest
+            if moved is False:
+                # The plain name is taken; record it so the fallback goes straight
+                # to the suffix search instead of renaming onto it again
+                if existing is None:
+                    existing = _NameSet(scanned=False)
+                existing.add(name)
+        return _fallback(path, _processed_dir, logger, existing)
+
+    return proc
+
+
+def _call_with_dir(path: str, logger: Optional[object] = None, existing: Optional[set[str]] = None, *, processed_dir: str, dedup: bool) -> str:
+    return process_new_file(path, processed_dir, logger, existing, dedup)
@@ -0,0 +1,98 @@
+"""Tests for processors.batch module"""
+import os
+import tempfile
+import shutil
+from unittest.mock import Mock, patch
+import pytest
+from processors.batch import BatchProcessor
+
+
+class TestBatchProcessor:
+    """Test suite for BatchProcessor class"""
+
+    @pytest.fixture
+    def temp_dirs(self):
+        """Create temporary directories for testing"""
+        source_dir = tempfile.mkdtemp()
+        processed_dir = tempfile.mkdtemp()
+        yield source_dir, processed_dir
+        shutil.rmtree(source_dir, ignore_errors=True)
+        shutil.rmtree(processed_dir, ignore_errors=True)
+
+    def test_batch_moves_submitted_files(self, temp_dirs):
+        """Test that every submitted file is moved before close returns"""
+        source_dir, processed_dir = temp_dirs
+        batch = BatchProcessor(processed_dir)
+
+        for i in range(50):
+            file_path = os.path.join(source_dir, f"file{i}.txt")
+            with open(file_path, "w") as f:
+                f.write(f"content {i}")
+            batch.submit(file_path)
+
+        batch.close()
+
+        assert sorted(os.listdir(processed_dir)) == sorted(f"file{i}.txt" for i in range(50))
+        assert os.listdir(source_dir) == []
+
+    def test_batch_suffixes_duplicates_within_batch(self, temp_dirs):
+        """Test that same-named files in one batch don't overwrite each other"""
+        source_dir, processed_dir = temp_dirs
+        with open(os.path.join(processed_dir, "dup.txt"), "w") as f:
+            f.write("existing")
+
+        batch = BatchProcessor(processed_dir, window=1.0)
+        for i in range(3):
+            sub = os.path.join(source_dir, str(i))
+            os.makedirs(sub)
+            file_path = os.path.join(sub, "dup.txt")
+            with open(file_path, "w") as f:
+                f.write(f"content {i}")
+            batch.submit(file_path)
+        batch.close()
+
+        assert sorted(os.listdir(processed_dir)) == ["dup-1.txt", "dup-2.txt", "dup-3.txt", "dup.txt"]
+
+    def test_batch_scans_only_on_collision(self, temp_dirs):
+        """Test that processed_dir is scanned once per batch, and only if a name collides"""
+        source_dir, processed_dir = temp_dirs
+        real_scandir = os.scandir
+
+        def drop(name, sub):
+            os.makedirs(os.path.join(source_dir, sub), exist_ok=True)
+            file_path = os.path.join(source_dir, sub, name)
+            with open(file_path, "w") as f:
+                f.write(sub)
+            return file_path
+
+        with patch("processors.file_processor.os.scandir", side_effect=real_scandir) as scandir:
+            batch = BatchProcessor(processed_dir, window=1.0)
+            for i in range(5):
+                batch.submit(drop(f"file{i}.txt", "a"))
+            batch.close()
+            assert scandir.call_count == 0
+
+            batch = BatchProcessor(processed_dir, window=1.0)
+            for sub in ("b", "c", "d"):
+                batch.submit(drop("file0.txt", sub))
+            batch.close()
+            assert scandir.call_count == 1
+
+        assert {"file0-1.txt", "file0-2.txt", "file0-3.txt"} <= set(os.listdir(processed_dir))
+
+    def test_batch_logs_errors_and_continues(self, temp_dirs):
+        """Test that a failing file is logged and later files are still moved"""
+        source_dir, processed_dir = temp_dirs
+        logger = Mock()
+        batch = BatchProcessor(processed_dir, logger=logger)
+
+        batch.submit(os.path.join(source_dir, "missing.txt"))
+        good = os.path.join(source_dir, "good.txt")
+        with open(good, "w") as f:
+            f.write("content")
+        batch.submit(good)
+        batch.close()
+
+        assert logger.exception.called
+        assert os.path.exists(os.path.join(processed_dir, "good.txt"))
+        assert any("Processed file" in str(call) for call in logger.info.call_args_list)
@@ -0,0 +1,207 @@
+"""Tests for processors.event_queue module"""
+import os
+import tempfile
+import shutil
+import threading
+from unittest.mock import patch
+import pytest
+from processors.event_queue import EventBatch, SettlePoller
+
+
+@pytest.fixture
+def watch_dir():
+    """Create a temporary directory for testing"""
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestEventBatch:
+    """Test suite for EventBatch class"""
+
+    def test_poll_settles_after_samples(self, watch_dir):
+        """Test that a file settles once its size repeats the required times"""
+        path = os.path.join(watch_dir, "a.txt")
+        _write(path, "content")
+        batch = EventBatch()
+        batch.add(path)
+
+        assert batch.poll(samples=3, max_tries=10) == ([], [])
+        assert batch.poll(samples=3, max_tries=10) == ([], [])
+        assert batch.poll(samples=3, max_tries=10) == ([path], [])
+        assert len(batch) == 0
+
+    def test_poll_resets_run_when_file_grows(self, watch_dir):
+        """Test that a size change restarts the settle count"""
+        path = os.path.join(watch_dir, "a.txt")
+        _write(path, "a")
+        batch = EventBatch()
+        batch.add(path)
+
+        batch.poll(samples=2, max_tries=10)
+        _write(path, "ab")
+        assert batch.poll(samples=2, max_tries=10) == ([], [])
+        assert batch.poll(samples=2, max_tries=10) == ([path], [])
+
+    def test_poll_gives_up_after_max_tries(self, watch_dir):
+        """Test that a missing file is given up on after max_tries polls"""
+        path = os.path.join(watch_dir, "missing.txt")
+        batch = EventBatch()
+        batch.add(path)
+
+        assert batch.poll(samples=2, max_tries=2) == ([], [])
+        assert batch.poll(samples=2, max_tries=2) == ([], [path])
+        assert len(batch) == 0
+
+    def test_poll_keeps_columns_aligned(self, watch_dir):
+        """Test that removing finished paths keeps the remaining state intact"""
+        done = os.path.join(watch_dir, "done.txt")
+        growing = os.path.join(watch_dir, "growing.txt")
+        _write(done, "x")
+        _write(growing, "x")
+        batch = EventBatch()
+        batch.add(growing)
+        batch.add(done)
+
+        batch.poll(samples=2, max_tries=10)
+        _write(growing, "xy")
+        assert batch.poll(samples=2, max_tries=10) == ([done], [])
+        assert batch.paths == [growing]
+        assert list(batch.prev_sizes) == [2]
+        assert batch.poll(samples=2, max_tries=10) == ([growing], [])
+
+    def test_poll_samples_open_fd_and_closes_it(self, watch_dir):
+        """Test that polls use fstat on one open fd, closed once the path is done"""
+        path = os.path.join(watch_dir, "a.txt")
+        _write(path, "content")
+        batch = EventBatch()
+        batch.add(path)
+
+        with patch("processors.event_queue.os.stat", side_effect=AssertionError("path stat")), \
+                patch("processors.event_queue.os.open", wraps=os.open) as mock_open:
+            batch.poll(samples=2, max_tries=10)
+            fd = batch.fds[0]
+            assert batch.poll(samples=2, max_tries=10) == ([path], [])
+
+        assert mock_open.call_count == 1
+        assert len(batch.fds) == 0
+        with pytest.raises(OSError):
+            os.fstat(fd)
+
+    def test_poll_caps_open_fds(self, watch_dir):
+        """Test that files beyond max_fds are sampled by path and still settle"""
+        paths = []
+        batch = EventBatch(max_fds=2)
+        for i in range(5):
+            path = os.path.join(watch_dir, f"file{i}.txt")
+            _write(path, "content")
+            paths.append(path)
+            batch.add(path)
+
+        batch.poll(samples=2, max_tries=10)
+        assert batch.held == 2
+        assert sum(1 for fd in batch.fds if fd >= 0) == 2
+        assert batch.poll(samples=2, max_tries=10) == (paths, [])
+        assert batch.held == 0
+
+    def test_poll_without_fds_uses_path_stat(self, watch_dir):
+        """Test that max_fds=0 (the Windows default) never holds the file open"""
+        path = os.path.join(watch_dir, "a.txt")
+        _write(path, "content")
+        batch = EventBatch(max_fds=0)
+        batch.add(path)
+
+        with patch("processors.event_queue.os.open", side_effect=AssertionError("opened")):
+            batch.poll(samples=2, max_tries=10)
+            os.rename(path, path + ".renamed")
+            _write(path, "content")
+            assert batch.poll(samples=2, max_tries=10) == ([path], [])
+
+    def test_poll_treats_deleted_file_as_missing(self, watch_dir):
+        """Test that a file unlinked after being opened stops counting as settled"""
+        path = os.path.join(watch_dir, "a.txt")
+        _write(path, "content")
+        batch = EventBatch()
+        batch.add(path)
+
+        batch.poll(samples=2, max_tries=2)
+        os.unlink(path)
+        assert batch.poll(samples=2, max_tries=2) == ([], [path])
+
+
+class TestSettlePoller:
+    """Test suite for SettlePoller class"""
+
+    def test_poller_reports_settled_files(self, watch_dir):
+        """Test that every added file is reported before close returns"""
+        results = []
+        lock = threading.Lock()
+
+        def on_ready(path, stable):
+            with lock:
+                results.append((path, stable))
+
+        poller = SettlePoller(on_ready, settle_seconds=0.01, max_tries=5)
+        paths = []
+        for i in range(5):
+            path = os.path.join(watch_dir, f"file{i}.txt")
+            _write(path, "content")
+            paths.append(path)
+            poller.add(path)
+        poller.add(paths[0])  # duplicate events are ignored
+        missing = os.path.join(watch_dir, "missing.txt")
+        poller.add(missing)
+        poller.close()
+
+        assert sorted(results) == sorted([(p, True) for p in paths] + [(missing, False)])
+
+    def test_poller_survives_callback_errors(self, watch_dir):
+        """Test that a failing callback doesn't stop later files"""
+        seen = []
+
+        def on_ready(path, stable):
+            seen.append(path)
+            raise RuntimeError("boom")
+
+        poller = SettlePoller(on_ready, settle_seconds=0.01, max_tries=5)
+        for i in range(2):
+            path = os.path.join(watch_dir, f"file{i}.txt")
+            _write(path, "content")
+            poller.add(path)
+        poller.close()
+
+        assert len(seen) == 2
+
+    def test_add_does_not_wait_for_poll(self, watch_dir):
+        """Test that add() returns while the poller thread is in the middle of a sweep"""
+        in_poll = threading.Event()
+        release = threading.Event()
+        real_poll = EventBatch.poll
+
+        def slow_poll(batch, samples, max_tries):
+            in_poll.set()
+            release.wait(5)
+            return real_poll(batch, samples, max_tries)
+
+        first = os.path.join(watch_dir, "first.txt")
+        second = os.path.join(watch_dir, "second.txt")
+        _write(first, "x")
+        _write(second, "y")
+        results = []
+        with patch.object(EventBatch, "poll", slow_poll):
+            poller = SettlePoller(lambda p, s: results.append(p), settle_seconds=0.01, max_tries=5)
+            poller.add(first)
+            assert in_poll.wait(5)
+
+            done = threading.Event()
+            threading.Thread(target=lambda: (poller.add(second), done.set())).start()
+            assert done.wait(1)
+            release.set()
+            poller.close()
+
+        assert sorted(results) == [first, second]
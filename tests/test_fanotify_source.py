@@ -0,0 +1,91 @@
+"""Tests for processors.fanotify_source module"""
+import os
+import sys
+import time
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="fanotify is Linux-only")
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Create a FanotifySource on a temporary watch dir, skipping without CAP_SYS_ADMIN"""
+    from processors.fanotify_source import FanotifySource
+
+    watch_dir = tmp_path / "in"
+    watch_dir.mkdir()
+    try:
+        src = FanotifySource(str(watch_dir))
+    except OSError as exc:
+        pytest.skip(f"fanotify unavailable: {exc}")
+    yield src, watch_dir
+    src.close()
+
+
+def _collect(src, expected, timeout=2.0):
+    seen = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and len(seen) < expected:
+        seen.extend(src.read(timeout=0.1))
+    # Drain anything else already queued
+    seen.extend(src.read(timeout=0.1))
+    return seen
+
+
+class TestFanotifySource:
+    """Test suite for FanotifySource class"""
+
+    def test_reports_closed_files_in_watch_dir(self, source):
+        """Test that files written in the watched dir are reported once closed"""
+        src, watch_dir = source
+
+        (watch_dir / "a.txt").write_text("a")
+        (watch_dir / "b.txt").write_text("b")
+
+        seen = _collect(src, 2)
+        assert sorted(seen) == sorted(os.path.realpath(watch_dir / n) for n in ("a.txt", "b.txt"))
+
+    def test_ignores_files_outside_watch_dir(self, source, tmp_path):
+        """Test that writes elsewhere on the filesystem are filtered out"""
+        src, watch_dir = source
+
+        (watch_dir / "sub").mkdir()
+        (watch_dir / "sub" / "nested.txt").write_text("n")
+        (tmp_path / "outside.txt").write_text("o")
+        (watch_dir / "inside.txt").write_text("i")
+
+        seen = _collect(src, 1)
+        assert seen == [os.path.realpath(watch_dir / "inside.txt")]
+
+    def test_ignores_files_deleted_before_read(self, source):
+        """Test that a file removed before its event is read is skipped"""
+        src, watch_dir = source
+
+        path = watch_dir / "gone.txt"
+        path.write_text("x")
+        path.unlink()
+
+        assert _collect(src, 1, timeout=0.3) == []
+
+    def test_closes_fds_of_unknown_version_events(self, source, tmp_path):
+        """Test that events skipped for a metadata version mismatch still have their fd closed"""
+        from unittest.mock import Mock, patch
+        from processors import fanotify_source
+
+        src, watch_dir = source
+        target = tmp_path / "target.txt"
+        target.write_text("t")
+        fds = [os.open(target, os.O_RDONLY) for _ in range(2)]
+        meta = fanotify_source._METADATA
+        data = b"".join(
+            meta.pack(meta.size, fanotify_source._METADATA_VERSION + 1, 0, meta.size, fanotify_source.FAN_CLOSE_WRITE, fd, 0)
+            for fd in fds
+        )
+
+        src._poll = Mock(poll=Mock(return_value=[(src._fd, 1)]))
+        with patch("processors.fanotify_source.os.read", return_value=data):
+            assert src.read(timeout=0) == []
+
+        for fd in fds:
+            with pytest.raises(OSError):
+                os.fstat(fd)
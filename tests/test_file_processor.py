@@ -1,10 +1,13 @@
 """Tests for processors.file_processor module"""
+import errno
 import os
 import tempfile
 import shutil
+import sys
 from pathlib import Path
+from unittest.mock import patch
 import pytest
-from processors.file_processor import process_new_file
+from processors.file_processor import _split_ext, process_new_file
 
 
 class TestProcessNewFile:
@@ -166,3 +169,322 @@ class TestProcessNewFile:
         # Should not raise exception
         dest = process_new_file(file_path, processed_dir, logger=logger)
         assert os.path.exists(dest)
+
+    def test_process_new_file_cross_device_copy(self, temp_dirs):
+        """Test that a cross-device rename falls back to copy + unlink"""
+        source_dir, processed_dir = temp_dirs
+        test_content = "cross device content\n" * 1000
+
+        file_path = os.path.join(source_dir, "xdev.txt")
+        with open(file_path, "w") as f:
+            f.write(test_content)
+        os.utime(file_path, (1_000_000_000, 1_000_000_000))
+
+        def fake_rename(src, dst):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        with patch("processors.file_processor._rename_noreplace", side_effect=fake_rename), \
+                patch("processors.file_processor.os.rename", side_effect=fake_rename):
+            dest = process_new_file(file_path, processed_dir)
+
+        assert not os.path.exists(file_path)
+        with open(dest, "r") as f:
+            assert f.read() == test_content
+        assert int(os.path.getmtime(dest)) == 1_000_000_000
+
+    @pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="copy_file_range not available")
+    def test_kernel_copy_falls_back_to_sendfile(self, temp_dirs):
+        """Test that an unsupported copy_file_range mid-copy continues with sendfile"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        src = os.path.join(source_dir, "src.bin")
+        dst = os.path.join(processed_dir, "dst.bin")
+        with open(src, "wb") as f:
+            f.write(data)
+
+        real_copy_file_range = os.copy_file_range
+        calls = []
+
+        def flaky_copy_file_range(src_fd, dst_fd, count, offset_src, offset_dst):
+            calls.append(offset_src)
+            if len(calls) > 1:
+                raise OSError(errno.EXDEV, "Invalid cross-device link")
+            return real_copy_file_range(src_fd, dst_fd, 1024 * 1024, offset_src, offset_dst)
+
+        src_fd = os.open(src, os.O_RDONLY)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            with patch("processors.file_processor.os.copy_file_range", side_effect=flaky_copy_file_range):
+                file_processor._kernel_copy(src_fd, dst_fd, len(data))
+        finally:
+            os.close(src_fd)
+            os.close(dst_fd)
+
+        assert calls == [0, 1024 * 1024]
+        with open(dst, "rb") as f:
+            assert f.read() == data
+
+    @pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="copy_file_range not available")
+    def test_kernel_copy_treats_zero_return_as_unsupported(self, temp_dirs):
+        """Test that copy_file_range returning 0 up front falls back to sendfile"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        data = os.urandom(100_000)
+        src = os.path.join(source_dir, "src.bin")
+        dst = os.path.join(processed_dir, "dst.bin")
+        with open(src, "wb") as f:
+            f.write(data)
+
+        src_fd = os.open(src, os.O_RDONLY)
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            with patch("processors.file_processor.os.copy_file_range", return_value=0):
+                copied = file_processor._kernel_copy(src_fd, dst_fd, len(data))
+        finally:
+            os.close(src_fd)
+            os.close(dst_fd)
+
+        assert copied == len(data)
+        with open(dst, "rb") as f:
+            assert f.read() == data
+
+    @pytest.mark.skipif(not hasattr(os, "sendfile") or not sys.platform.startswith("linux"),
+                        reason="kernel copy path is Linux-only")
+    def test_copy_then_unlink_keeps_source_on_short_copy(self, temp_dirs):
+        """Test that an incomplete copy removes dst and leaves the source in place"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        src = os.path.join(source_dir, "src.bin")
+        dst = os.path.join(processed_dir, "dst.bin")
+        with open(src, "wb") as f:
+            f.write(b"x" * 100_000)
+
+        with patch("processors.file_processor._kernel_copy", return_value=0):
+            with pytest.raises(OSError):
+                file_processor._copy_then_unlink(src, dst)
+
+        assert os.path.getsize(src) == 100_000
+        assert not os.path.exists(dst)
+
+    def test_process_new_file_rename_error_propagates(self, temp_dirs):
+        """Test that rename errors other than EXDEV are not swallowed"""
+        source_dir, processed_dir = temp_dirs
+
+        file_path = os.path.join(source_dir, "test.txt")
+        with open(file_path, "w") as f:
+            f.write("content")
+
+        denied = PermissionError(errno.EACCES, "denied")
+        with patch("processors.file_processor._rename_noreplace", side_effect=denied), \
+                patch("processors.file_processor.os.rename", side_effect=denied):
+            with pytest.raises(PermissionError):
+                process_new_file(file_path, processed_dir)
+
+        # Source is left in place for a retry
+        assert os.path.exists(file_path)
+
+    def test_process_new_file_fills_first_free_suffix(self, temp_dirs):
+        """Test that the first unused suffix is chosen when there are gaps"""
+        source_dir, processed_dir = temp_dirs
+
+        for existing in ("report.txt", "report-1.txt", "report-3.txt"):
+            with open(os.path.join(processed_dir, existing), "w") as f:
+                f.write("old")
+
+        file_path = os.path.join(source_dir, "report.txt")
+        with open(file_path, "w") as f:
+            f.write("new")
+
+        dest = process_new_file(file_path, processed_dir)
+        assert os.path.basename(dest) == "report-2.txt"
+
+    def test_process_new_file_recreates_removed_processed_dir(self, temp_dirs):
+        """Test that a processed_dir deleted after first use is recreated"""
+        source_dir, processed_dir = temp_dirs
+        target_dir = os.path.join(processed_dir, "out")
+
+        for i in range(2):
+            file_path = os.path.join(source_dir, "test.txt")
+            with open(file_path, "w") as f:
+                f.write(f"content {i}")
+            dest = process_new_file(file_path, target_dir)
+            assert os.path.exists(dest)
+            shutil.rmtree(target_dir)
+
+    def test_process_new_file_shared_snapshot_sequence(self, temp_dirs):
+        """Test that a shared name snapshot hands out consecutive suffixes"""
+        from processors.file_processor import _existing_names
+
+        source_dir, processed_dir = temp_dirs
+        with open(os.path.join(processed_dir, "burst.txt"), "w") as f:
+            f.write("existing")
+
+        existing = _existing_names(processed_dir)
+        names = []
+        for i in range(5):
+            file_path = os.path.join(source_dir, "burst.txt")
+            with open(file_path, "w") as f:
+                f.write(f"content {i}")
+            names.append(os.path.basename(process_new_file(file_path, processed_dir, existing=existing)))
+
+        assert names == [f"burst-{i}.txt" for i in range(1, 6)]
+        assert set(os.listdir(processed_dir)) == existing
+
+    def test_process_new_file_never_overwrites_stale_snapshot(self, temp_dirs):
+        """Test that a name created after the snapshot is not overwritten"""
+        from processors.file_processor import _existing_names
+
+        source_dir, processed_dir = temp_dirs
+        existing = _existing_names(processed_dir)
+
+        # Appears after the snapshot was taken
+        with open(os.path.join(processed_dir, "late.txt"), "w") as f:
+            f.write("keep me")
+
+        file_path = os.path.join(source_dir, "late.txt")
+        with open(file_path, "w") as f:
+            f.write("new")
+
+        dest = process_new_file(file_path, processed_dir, existing=existing)
+
+        assert os.path.basename(dest) == "late-1.txt"
+        with open(os.path.join(processed_dir, "late.txt")) as f:
+            assert f.read() == "keep me"
+
+    @pytest.mark.parametrize("atomic", [True, False])
+    def test_rename_noreplace_refuses_existing(self, temp_dirs, atomic):
+        """Test that _move reports an existing target instead of replacing it"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        src = os.path.join(source_dir, "a.txt")
+        dst = os.path.join(processed_dir, "a.txt")
+        for p, content in ((src, "src"), (dst, "dst")):
+            with open(p, "w") as f:
+                f.write(content)
+
+        if atomic:
+            assert file_processor._move(src, dst) is False
+        else:
+            with patch.object(file_processor, "_rename_noreplace", return_value=None):
+                assert file_processor._move(src, dst) is False
+
+        with open(dst) as f:
+            assert f.read() == "dst"
+        assert os.path.exists(src)
+
+    def test_process_new_file_dotfile_duplicates(self, temp_dirs):
+        """Test that dotfiles get the suffix appended rather than treated as an extension"""
+        source_dir, processed_dir = temp_dirs
+
+        destinations = []
+        for name in (".env", ".env", ".config.json", ".config.json"):
+            file_path = os.path.join(source_dir, name)
+            with open(file_path, "w") as f:
+                f.write("content")
+            destinations.append(os.path.basename(process_new_file(file_path, processed_dir)))
+
+        assert destinations == [".env", ".env-1", ".config.json", ".config-1.json"]
+
+
+class TestDedup:
+    """Test suite for process_new_file duplicate detection"""
+
+    @pytest.fixture
+    def temp_dirs(self):
+        """Create temporary directories and forget any cached digest index"""
+        from processors import file_processor
+
+        source_dir = tempfile.mkdtemp()
+        processed_dir = tempfile.mkdtemp()
+        yield source_dir, processed_dir
+        file_processor._dedup_indexes.clear()
+        shutil.rmtree(source_dir, ignore_errors=True)
+        shutil.rmtree(processed_dir, ignore_errors=True)
+
+    def _drop(self, source_dir, name, content):
+        file_path = os.path.join(source_dir, name)
+        with open(file_path, "wb") as f:
+            f.write(content)
+        return file_path
+
+    def test_identical_content_is_removed(self, temp_dirs):
+        """Test that a re-dropped identical file is removed and the first copy returned"""
+        source_dir, processed_dir = temp_dirs
+
+        first = process_new_file(self._drop(source_dir, "a.txt", b"same"), processed_dir, dedup=True)
+        second_src = self._drop(source_dir, "b.txt", b"same")
+        second = process_new_file(second_src, processed_dir, dedup=True)
+
+        assert second == first
+        assert not os.path.exists(second_src)
+        assert sorted(os.listdir(processed_dir)) == [".dedup.jsonl", "a.txt"]
+
+    def test_different_content_is_kept(self, temp_dirs):
+        """Test that same-named files with different content both survive"""
+        source_dir, processed_dir = temp_dirs
+
+        process_new_file(self._drop(source_dir, "a.txt", b"one"), processed_dir, dedup=True)
+        dest = process_new_file(self._drop(source_dir, "a.txt", b"two"), processed_dir, dedup=True)
+
+        assert os.path.basename(dest) == "a-1.txt"
+
+    def test_empty_files_are_deduplicated(self, temp_dirs):
+        """Test that empty files hash without mmap errors"""
+        source_dir, processed_dir = temp_dirs
+
+        first = process_new_file(self._drop(source_dir, "empty", b""), processed_dir, dedup=True)
+        second = process_new_file(self._drop(source_dir, "empty2", b""), processed_dir, dedup=True)
+
+        assert second == first
+
+    def test_index_persists_across_restarts(self, temp_dirs):
+        """Test that the sidecar index is reloaded when the cache is cold"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        first = process_new_file(self._drop(source_dir, "a.txt", b"payload"), processed_dir, dedup=True)
+
+        file_processor._dedup_indexes.clear()
+        second = process_new_file(self._drop(source_dir, "b.txt", b"payload"), processed_dir, dedup=True)
+
+        assert second == first
+
+    def test_modified_original_is_not_trusted(self, temp_dirs):
+        """Test that a processed file changed after indexing no longer counts as a match"""
+        source_dir, processed_dir = temp_dirs
+        first = process_new_file(self._drop(source_dir, "a.txt", b"payload"), processed_dir, dedup=True)
+
+        with open(first, "wb") as f:
+            f.write(b"PAYLOAD")
+        os.utime(first, ns=(0, 0))
+
+        second = process_new_file(self._drop(source_dir, "b.txt", b"payload"), processed_dir, dedup=True)
+
+        assert os.path.basename(second) == "b.txt"
+
+    def test_dedup_off_by_default(self, temp_dirs):
+        """Test that identical files are kept when dedup is not requested"""
+        source_dir, processed_dir = temp_dirs
+
+        process_new_file(self._drop(source_dir, "a.txt", b"same"), processed_dir)
+        dest = process_new_file(self._drop(source_dir, "b.txt", b"same"), processed_dir)
+
+        assert os.path.basename(dest) == "b.txt"
+        assert ".dedup.jsonl" not in os.listdir(processed_dir)
+
+
+class TestSplitExt:
+    """Test suite for _split_ext helper"""
+
+    @pytest.mark.parametrize("name", [
+        "file.txt", "archive.tar.gz", "noext", ".env", "..env", "...", ".config.json",
+        "..a.b", "trailing.", "a.b.", "",
+    ])
+    def test_split_ext_matches_os_path(self, name):
+        """Test that _split_ext agrees with os.path.splitext on bare names"""
+        assert _split_ext(name) == os.path.splitext(name)
@@ -0,0 +1,120 @@
+"""Tests for processors.specialize module"""
+import os
+import tempfile
+import shutil
+from unittest.mock import Mock
+import pytest
+from processors.file_processor import _existing_names
+from processors.specialize import build_processor
+
+
+class TestBuildProcessor:
+    """Test suite for build_processor function"""
+
+    @pytest.fixture
+    def temp_dirs(self):
+        """Create temporary directories for testing"""
+        source_dir = tempfile.mkdtemp()
+        processed_dir = tempfile.mkdtemp()
+        yield source_dir, processed_dir
+        shutil.rmtree(source_dir, ignore_errors=True)
+        shutil.rmtree(processed_dir, ignore_errors=True)
+
+    def _drop(self, source_dir, name, content="content"):
+        file_path = os.path.join(source_dir, name)
+        with open(file_path, "w") as f:
+            f.write(content)
+        return file_path
+
+    def test_moves_file_and_logs(self, temp_dirs):
+        """Test that the common path moves the file and logs like process_new_file"""
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir)
+        logger = Mock()
+
+        src = self._drop(source_dir, "a.txt")
+        dest = proc(src, logger)
+
+        assert dest == os.path.join(processed_dir, "a.txt")
+        assert os.path.exists(dest)
+        assert not os.path.exists(src)
+        logger.info.assert_called_once_with("Moved file to processed dir: %s", dest)
+
+    def test_collisions_fall_back_to_suffix(self, temp_dirs):
+        """Test that an existing name gets the usual numeric suffix"""
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir)
+
+        names = [os.path.basename(proc(self._drop(source_dir, "dup.txt"))) for _ in range(3)]
+
+        assert names == ["dup.txt", "dup-1.txt", "dup-2.txt"]
+
+    def test_updates_shared_snapshot(self, temp_dirs):
+        """Test that a shared snapshot records names chosen on the fast path"""
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir)
+        existing = _existing_names(processed_dir)
+
+        proc(self._drop(source_dir, "a.txt"), None, existing)
+        dest = proc(self._drop(source_dir, "a.txt"), None, existing)
+
+        assert existing == {"a.txt", "a-1.txt"}
+        assert os.path.basename(dest) == "a-1.txt"
+
+    def test_creates_missing_processed_dir(self, temp_dirs):
+        """Test that a processed_dir that doesn't exist yet is created on first use"""
+        source_dir, processed_dir = temp_dirs
+        target = os.path.join(processed_dir, "new", "out")
+        proc = build_processor(target)
+        assert not os.path.exists(target)
+
+        dest = proc(self._drop(source_dir, "a.txt"))
+
+        assert dest == os.path.join(target, "a.txt")
+        assert os.path.exists(dest)
+
+    def test_missing_source_raises(self, temp_dirs):
+        """Test that a vanished source still raises"""
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir)
+
+        with pytest.raises(FileNotFoundError):
+            proc(os.path.join(source_dir, "missing.txt"))
+
+    def test_dedup_processor_removes_duplicates(self, temp_dirs):
+        """Test that the dedup variant behaves like process_new_file with dedup"""
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir, dedup=True)
+        try:
+            first = proc(self._drop(source_dir, "a.txt", "same"))
+            second = proc(self._drop(source_dir, "b.txt", "same"))
+        finally:
+            file_processor._dedup_indexes.clear()
+
+        assert second == first
+
+    def test_collision_renames_plain_name_once(self, temp_dirs):
+        """Test that after a collision the fallback goes straight to suffixed names"""
+        from unittest.mock import patch
+        from processors import file_processor
+
+        source_dir, processed_dir = temp_dirs
+        proc = build_processor(processed_dir)
+        proc(self._drop(source_dir, "a.txt"))
+
+        targets = []
+        real_move = file_processor._move
+
+        def tracking_move(src, dst):
+            targets.append(os.path.basename(dst))
+            return real_move(src, dst)
+
+        with patch("processors.file_processor._move", side_effect=tracking_move), \
+                patch("processors.specialize._move", side_effect=tracking_move):
+            proc = build_processor(processed_dir)
+            dest = proc(self._drop(source_dir, "a.txt"))
+
+        assert os.path.basename(dest) == "a-1.txt"
+        assert targets == ["a.txt", "a-1.txt"]
@@ -3,9 +3,23 @@ import os
 import tempfile
 import shutil
 import logging
+import sys
+import threading
+import time
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from watcher import NewFileHandler, ensure_dir, setup_logger, parse_args
+from watcher import (
+    BufferedRotatingFileHandler,
+    CachedTimeFormatter,
+    NewFileHandler,
+    emits_close_events,
+    ensure_dir,
+    make_observer,
+    setup_logger,
+    stop_logger,
+    parse_args,
+    watch_inotify,
+)
 
 
 class TestEnsureDir:
@@ -51,10 +65,8 @@ class TestSetupLogger:
             assert os.path.exists(logfile)
             assert logger.name == "folder_watcher"
             
-            # Cleanup: remove handlers to release file locks
-            for handler in logger.handlers[:]:
-                handler.close()
-                logger.removeHandler(handler)
+            # Cleanup: stop the listener and remove handlers to release file locks
+            stop_logger(logger)
 
     def test_setup_logger_returns_logger(self):
         """Test that setup_logger returns a Logger instance"""
@@ -65,10 +77,8 @@ class TestSetupLogger:
             assert isinstance(logger, logging.Logger)
             assert logger.level == logging.INFO
             
-            # Cleanup: remove handlers to release file locks
-            for handler in logger.handlers[:]:
-                handler.close()
-                logger.removeHandler(handler)
+            # Cleanup: stop the listener and remove handlers to release file locks
+            stop_logger(logger)
 
     def test_setup_logger_rotating_handler(self):
         """Test that rotating file handler is configured"""
@@ -76,16 +86,134 @@ class TestSetupLogger:
             logfile = os.path.join(tmpdir, "test.log")
             logger = setup_logger(logfile)
             
-            # Check for RotatingFileHandler
+            # Check for RotatingFileHandler behind the queue listener
+            listener = logger.handlers[0].listener
             has_rotating_handler = any(
-                hasattr(h, 'maxBytes') for h in logger.handlers
+                hasattr(h, 'maxBytes') for h in listener.handlers
             )
             assert has_rotating_handler
             
-            # Cleanup: remove handlers to release file locks
-            for handler in logger.handlers[:]:
+            # Cleanup: stop the listener and remove handlers to release file locks
+            stop_logger(logger)
+
+    def test_stop_logger_flushes_queued_records(self):
+        """Test that records logged before stop_logger reach the log file"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, "test.log")
+            logger = setup_logger(logfile)
+
+            for i in range(100):
+                logger.info("Queued message %d", i)
+            stop_logger(logger)
+
+            with open(logfile, encoding="utf-8") as f:
+                content = f.read()
+            assert "Queued message 0" in content
+            assert "Queued message 99" in content
+            assert logger.handlers == []
+
+
+class TestBufferedRotatingFileHandler:
+    """Test suite for BufferedRotatingFileHandler class"""
+
+    def _record(self, msg):
+        return logging.LogRecord("t", logging.INFO, __file__, 0, msg, None, None)
+
+    def test_buffers_until_flush(self):
+        """Test that records are held in the buffer until flush is called"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, "test.log")
+            handler = BufferedRotatingFileHandler(logfile, maxBytes=1024 * 1024, backupCount=1, encoding="utf-8")
+            try:
+                handler.emit(self._record("buffered line"))
+                assert os.path.getsize(logfile) == 0
+
+                handler.flush()
+                with open(logfile, encoding="utf-8") as f:
+                    assert f.read() == "buffered line\n"
+            finally:
                 handler.close()
-                logger.removeHandler(handler)
+
+    def test_rolls_over_at_max_bytes(self):
+        """Test that the file is rotated once maxBytes would be exceeded"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, "test.log")
+            handler = BufferedRotatingFileHandler(logfile, maxBytes=100, backupCount=2, encoding="utf-8")
+            try:
+                for i in range(20):
+                    handler.emit(self._record(f"message number {i:02d}"))
+            finally:
+                handler.close()
+
+            assert os.path.exists(logfile + ".1")
+            assert os.path.exists(logfile + ".2")
+            assert not os.path.exists(logfile + ".3")
+            for name in (logfile, logfile + ".1", logfile + ".2"):
+                assert os.path.getsize(name) < 100
+            with open(logfile, encoding="utf-8") as f:
+                assert f.read().endswith("message number 19\n")
+
+    def test_max_bytes_counts_encoded_bytes(self):
+        """Test that non-ASCII records are measured in bytes, not characters"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, "test.log")
+            handler = BufferedRotatingFileHandler(logfile, maxBytes=100, backupCount=5, encoding="utf-8")
+            try:
+                for i in range(10):
+                    handler.emit(self._record(f"файл_{i:02d}.txt"))
+            finally:
+                handler.close()
+
+            for name in [logfile] + [f"{logfile}.{n}" for n in range(1, 6)]:
+                if os.path.exists(name):
+                    assert os.path.getsize(name) < 100
+
+    def test_setup_logger_flushes_when_idle(self):
+        """Test that the listener flushes the file once the queue drains"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, "test.log")
+            logger = setup_logger(logfile)
+            try:
+                logger.info("Idle flush message")
+                for _ in range(100):
+                    if os.path.getsize(logfile):
+                        break
+                    time.sleep(0.01)
+                with open(logfile, encoding="utf-8") as f:
+                    assert "Idle flush message" in f.read()
+            finally:
+                stop_logger(logger)
+
+
+class TestCachedTimeFormatter:
+    """Test suite for CachedTimeFormatter class"""
+
+    def _record(self, created):
+        record = logging.LogRecord("t", logging.INFO, __file__, 0, "msg", None, None)
+        record.created = created
+        record.msecs = (created - int(created)) * 1000
+        return record
+
+    @pytest.mark.parametrize("datefmt", [None, "%Y-%m-%d %H:%M:%S"])
+    def test_matches_standard_formatter(self, datefmt):
+        """Test that output is identical to logging.Formatter"""
+        fmt = "%(asctime)s %(levelname)s %(message)s"
+        cached = CachedTimeFormatter(fmt, datefmt=datefmt)
+        standard = logging.Formatter(fmt, datefmt=datefmt)
+
+        for created in (1_700_000_000.125, 1_700_000_000.875, 1_700_000_001.5):
+            record = self._record(created)
+            assert cached.format(record) == standard.format(record)
+
+    def test_reuses_date_within_same_second(self):
+        """Test that strftime runs once per second of records"""
+        formatter = CachedTimeFormatter("%(asctime)s %(message)s")
+
+        with patch('watcher.time.strftime', wraps=time.strftime) as mock_strftime:
+            for created in (1_700_000_000.1, 1_700_000_000.2, 1_700_000_000.9, 1_700_000_001.0):
+                formatter.format(self._record(created))
+
+        assert mock_strftime.call_count == 2
 
 
 class TestNewFileHandler:
@@ -167,6 +295,56 @@ class TestNewFileHandler:
         # Should log stable file
         assert any("New file detected" in str(call) for call in mock_logger.info.call_args_list)
 
+    def test_handler_settle_tracks_growing_file(self, mock_logger, temp_dirs):
+        """Test that settling waits until the file stops growing"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, settle_seconds=0, max_tries=10)
+
+        test_file = os.path.join(watch_dir, "growing.txt")
+        with open(test_file, "w") as f:
+            f.write("start")
+
+        writes = iter(["more", "more", ""])
+
+        def grow(_):
+            chunk = next(writes, "")
+            if chunk:
+                with open(test_file, "a") as f:
+                    f.write(chunk)
+
+        with patch('watcher.time.sleep', side_effect=grow) as mock_sleep:
+            assert handler._wait_for_settle(test_file) is True
+
+        # Two growth steps, then one sleep before the repeated size is seen
+        assert mock_sleep.call_count == 3
+
+    def test_handler_settle_requires_configured_samples(self, mock_logger, temp_dirs):
+        """Test that settle_samples equal readings are needed before settling"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(
+            mock_logger,
+            processed_dir=processed_dir,
+            settle_seconds=0,
+            max_tries=10,
+            settle_samples=4
+        )
+
+        test_file = os.path.join(watch_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        with patch('watcher.time.sleep') as mock_sleep:
+            assert handler._wait_for_settle(test_file) is True
+
+        assert mock_sleep.call_count == 3
+
+    def test_handler_settle_gives_up_on_missing_file(self, mock_logger, temp_dirs):
+        """Test that settling reports an unstable file when it never appears"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, settle_seconds=0, max_tries=3)
+
+        assert handler._wait_for_settle(os.path.join(watch_dir, "missing.txt")) is False
+
     def test_handler_processes_file(self, mock_logger, temp_dirs):
         """Test that handler processes files when processed_dir is set"""
         watch_dir, processed_dir = temp_dirs
@@ -230,8 +408,8 @@ class TestNewFileHandler:
         with open(test_file, "w") as f:
             f.write("content")
         
-        # Mock process_new_file to raise an exception
-        with patch('watcher.process_new_file', side_effect=Exception("Test error")):
+        # Mock the file processor to raise an exception
+        with patch.object(handler, '_proc', side_effect=Exception("Test error")):
             event = Mock()
             event.is_directory = False
             event.src_path = test_file
@@ -242,6 +420,316 @@ class TestNewFileHandler:
         # Should log exception
         assert mock_logger.exception.called
 
+    def test_handler_processes_on_close_event(self, mock_logger, temp_dirs):
+        """Test that close-after-write events are processed without settling"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(
+            mock_logger,
+            processed_dir=processed_dir,
+            settle_seconds=10,
+            max_tries=10,
+            close_events=True
+        )
+
+        test_file = os.path.join(watch_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = test_file
+
+        with patch('watcher.time.sleep') as mock_sleep:
+            handler.on_closed(event)
+
+        mock_sleep.assert_not_called()
+        assert os.path.exists(os.path.join(processed_dir, "test.txt"))
+        assert any("New file detected: %s" in str(call) for call in mock_logger.info.call_args_list)
+
+    def test_handler_defers_created_to_close_event(self, mock_logger, temp_dirs):
+        """Test that on_created does nothing when close events are in use"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True)
+
+        test_file = os.path.join(watch_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = test_file
+
+        handler.on_created(event)
+
+        mock_logger.info.assert_not_called()
+        assert os.path.exists(test_file)
+
+    def test_handler_ignores_close_event_without_close_mode(self, mock_logger, temp_dirs):
+        """Test that on_closed is ignored when the settle heuristic is in use"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir)
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = os.path.join(watch_dir, "test.txt")
+
+        handler.on_closed(event)
+
+        mock_logger.info.assert_not_called()
+
+    def test_handler_callbacks_do_not_block(self, mock_logger, temp_dirs):
+        """Test that with a poller and batch, event callbacks return before settle or move run"""
+        from processors.batch import BatchProcessor
+        from processors.event_queue import SettlePoller
+
+        watch_dir, processed_dir = temp_dirs
+        release = threading.Event()
+        batch = BatchProcessor(processed_dir)
+        real_proc = batch._proc
+
+        def blocking_proc(path, logger, existing):
+            release.wait(5)
+            return real_proc(path, logger, existing)
+
+        batch._proc = blocking_proc
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, batch=batch)
+        handler.poller = SettlePoller(handler._handle, settle_seconds=0.01, max_tries=5)
+        closing = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True, batch=batch)
+
+        events = []
+        for name in ("created.txt", "closed.txt"):
+            path = os.path.join(watch_dir, name)
+            with open(path, "w") as f:
+                f.write("content")
+            event = Mock()
+            event.is_directory = False
+            event.src_path = path
+            events.append(event)
+
+        with patch.object(handler, '_wait_for_settle', side_effect=AssertionError("settled inline")):
+            start = time.monotonic()
+            handler.on_created(events[0])
+            closing.on_closed(events[1])
+            assert time.monotonic() - start < 1
+            handler.poller.close()
+
+        release.set()
+        batch.close()
+        assert sorted(os.listdir(processed_dir)) == ["closed.txt", "created.txt"]
+
+    def test_handler_submits_to_batch(self, mock_logger, temp_dirs):
+        """Test that handler hands files to the batch processor when one is set"""
+        watch_dir, processed_dir = temp_dirs
+        batch = Mock()
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True, batch=batch)
+
+        test_file = os.path.join(watch_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = test_file
+
+        handler.on_closed(event)
+
+        batch.submit.assert_called_once_with(test_file)
+        # Moving is left to the batch worker
+        assert os.path.exists(test_file)
+
+    def test_handler_hands_created_file_to_poller(self, mock_logger, temp_dirs):
+        """Test that on_created defers settling to the poller when one is set"""
+        watch_dir, processed_dir = temp_dirs
+        poller = Mock()
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, poller=poller)
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = os.path.join(watch_dir, "test.txt")
+
+        with patch('watcher.time.sleep') as mock_sleep:
+            handler.on_created(event)
+
+        poller.add.assert_called_once_with(event.src_path)
+        mock_sleep.assert_not_called()
+        mock_logger.info.assert_not_called()
+
+    def test_handler_skips_info_calls_when_disabled(self, temp_dirs):
+        """Test that info logging is bypassed when INFO is disabled, but errors still log"""
+        watch_dir, processed_dir = temp_dirs
+        quiet_logger = Mock(spec=logging.Logger)
+        quiet_logger.isEnabledFor.return_value = False
+        handler = NewFileHandler(quiet_logger, processed_dir=processed_dir, close_events=True)
+
+        test_file = os.path.join(watch_dir, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = test_file
+        handler.on_closed(event)
+
+        quiet_logger.info.assert_not_called()
+        assert os.path.exists(os.path.join(processed_dir, "test.txt"))
+
+        with patch.object(handler, '_proc', side_effect=Exception("Test error")):
+            handler.on_closed(event)
+        assert quiet_logger.exception.called
+
+    def test_handler_processes_renamed_in_file_in_close_mode(self, mock_logger, temp_dirs):
+        """Test that a file renamed into the watched dir is handled from on_moved"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True)
+
+        test_file = os.path.join(watch_dir, "staged.txt")
+        with open(test_file, "w") as f:
+            f.write("content")
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = ""
+        event.dest_path = test_file
+        handler.on_moved(event)
+
+        assert os.path.exists(os.path.join(processed_dir, "staged.txt"))
+
+    def test_handler_waits_for_temp_file_rename_in_close_mode(self, mock_logger, temp_dirs):
+        """Test that a hidden temp file is left for its producer to rename"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True)
+
+        temp_file = os.path.join(watch_dir, ".report.csv.Ab12Cd")
+        with open(temp_file, "w") as f:
+            f.write("content")
+        closed = Mock()
+        closed.is_directory = False
+        closed.src_path = temp_file
+        handler.on_closed(closed)
+        assert os.path.exists(temp_file)
+
+        final = os.path.join(watch_dir, "report.csv")
+        os.rename(temp_file, final)
+        moved = Mock()
+        moved.is_directory = False
+        moved.src_path = temp_file
+        moved.dest_path = final
+        handler.on_moved(moved)
+
+        assert os.listdir(processed_dir) == ["report.csv"]
+
+    def test_handler_ignores_move_out_of_watch_dir(self, mock_logger, temp_dirs):
+        """Test that a move with no destination inside the watched dir is ignored"""
+        watch_dir, processed_dir = temp_dirs
+        handler = NewFileHandler(mock_logger, processed_dir=processed_dir, close_events=True)
+
+        event = Mock()
+        event.is_directory = False
+        event.src_path = os.path.join(watch_dir, "gone.txt")
+        event.dest_path = ""
+        handler.on_moved(event)
+
+        mock_logger.info.assert_not_called()
+
+    def test_emits_close_events_for_polling_observer(self):
+        """Test that a polling observer is not treated as reporting close events"""
+        from watchdog.observers.polling import PollingObserver
+        assert emits_close_events(PollingObserver()) is False
+
+
+def _wait_for(path, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not os.path.exists(path):
+        time.sleep(0.01)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+class TestObserverCloseMode:
+    """Test suite for watchdog's inotify observer in close-event mode"""
+
+    def test_observer_processes_written_and_renamed_in_files(self, tmp_path):
+        """Test that both a file written in place and one renamed in are moved"""
+        watch_dir = tmp_path / "in"
+        staging = tmp_path / "staging"
+        processed_dir = tmp_path / "out"
+        watch_dir.mkdir()
+        staging.mkdir()
+
+        observer = make_observer()
+        assert emits_close_events(observer)
+        handler = NewFileHandler(Mock(spec=logging.Logger), processed_dir=str(processed_dir), close_events=True)
+        observer.schedule(handler, str(watch_dir), recursive=False)
+        observer.start()
+        try:
+            (watch_dir / "written.txt").write_text("w")
+            (staging / "staged.txt").write_text("s")
+            os.rename(staging / "staged.txt", watch_dir / "staged.txt")
+            _wait_for(processed_dir / "written.txt")
+            _wait_for(processed_dir / "staged.txt")
+        finally:
+            observer.stop()
+            observer.join()
+
+        assert sorted(os.listdir(processed_dir)) == ["staged.txt", "written.txt"]
+        assert os.listdir(watch_dir) == []
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+class TestWatchInotify:
+    """Test suite for the native inotify loop"""
+
+    def test_watch_inotify_processes_closed_files(self, tmp_path):
+        """Test that a file written into the watched dir is moved once closed"""
+        pytest.importorskip("inotify_simple")
+        watch_dir = tmp_path / "in"
+        processed_dir = tmp_path / "out"
+        watch_dir.mkdir()
+        handler = NewFileHandler(Mock(spec=logging.Logger), processed_dir=str(processed_dir), close_events=True)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=watch_inotify, args=(str(watch_dir), handler, stop))
+        thread.start()
+        try:
+            time.sleep(0.1)
+            (watch_dir / "test.txt").write_text("content")
+            for _ in range(100):
+                if (processed_dir / "test.txt").exists():
+                    break
+                time.sleep(0.01)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert (processed_dir / "test.txt").read_text() == "content"
+        assert not (watch_dir / "test.txt").exists()
+
+
+    def test_watch_inotify_processes_renamed_in_files(self, tmp_path):
+        """Test that a file renamed into the watched dir is moved without a close event"""
+        pytest.importorskip("inotify_simple")
+        watch_dir = tmp_path / "in"
+        staging = tmp_path / "staging"
+        processed_dir = tmp_path / "out"
+        watch_dir.mkdir()
+        staging.mkdir()
+        (staging / "staged.txt").write_text("content")
+        (watch_dir / "sub").mkdir()
+        handler = NewFileHandler(Mock(spec=logging.Logger), processed_dir=str(processed_dir), close_events=True)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=watch_inotify, args=(str(watch_dir), handler, stop))
+        thread.start()
+        try:
+            time.sleep(0.1)
+            os.rename(staging / "staged.txt", watch_dir / "staged.txt")
+            os.rename(watch_dir / "sub", watch_dir / "subdir")
+            _wait_for(processed_dir / "staged.txt")
+        finally:
+            stop.set()
+            thread.join()
+
+        assert (processed_dir / "staged.txt").read_text() == "content"
+        assert os.listdir(watch_dir) == ["subdir"]
 
 class TestParseArgs:
     """Test suite for parse_args function"""
@@ -256,6 +744,9 @@ class TestParseArgs:
             assert args.processed == r"D:\Data Engineering\Data\Processed"
             assert args.settle == 0.5
             assert args.tries == 10
+            assert args.samples == 2
+            assert args.dedup is False
+            assert args.backend == "auto"
 
     def test_parse_args_custom_path(self):
         """Test that parse_args accepts custom path"""
@@ -277,3 +768,61 @@ class TestParseArgs:
             args = parse_args()
             assert args.settle == 1.5
             assert args.tries == 20
+
+    def test_parse_args_samples(self):
+        """Test that parse_args accepts the settle samples parameter"""
+        with patch('sys.argv', ['watcher.py', '--samples', '3']):
+            args = parse_args()
+            assert args.samples == 3
+
+    def test_parse_args_equals_form(self):
+        """Test that parse_args accepts --flag=value"""
+        with patch('sys.argv', ['watcher.py', '--processed=C:\\proc', '--tries=3']):
+            args = parse_args()
+            assert args.processed == 'C:\\proc'
+            assert args.tries == 3
+
+    def test_parse_args_abbreviated_flag(self):
+        """Test that abbreviated flags still work through the full parser"""
+        with patch('sys.argv', ['watcher.py', '--proc', 'C:\\proc']):
+            args = parse_args()
+            assert args.processed == 'C:\\proc'
+            assert args.path == r"D:\Data Engineering\Data\DataIn"
+
+    def test_parse_args_invalid_value_exits(self):
+        """Test that a bad value is reported by argparse"""
+        with patch('sys.argv', ['watcher.py', '--tries', 'many']):
+            with pytest.raises(SystemExit):
+                parse_args()
+
+    def test_parse_args_unknown_flag_exits(self):
+        """Test that an unknown flag is reported by argparse"""
+        with patch('sys.argv', ['watcher.py', '--bogus']):
+            with pytest.raises(SystemExit):
+                parse_args()
+
+    def test_parse_args_help_exits(self, capsys):
+        """Test that --help prints usage"""
+        with patch('sys.argv', ['watcher.py', '--help']):
+            with pytest.raises(SystemExit):
+                parse_args()
+        assert "--processed" in capsys.readouterr().out
+
+    def test_parse_args_dedup_switch(self):
+        """Test that --dedup turns on duplicate detection"""
+        with patch('sys.argv', ['watcher.py', '--dedup', '-d', 'C:\\proc']):
+            args = parse_args()
+            assert args.dedup is True
+            assert args.processed == 'C:\\proc'
+
+    def test_parse_args_backend(self):
+        """Test that parse_args accepts a known backend"""
+        with patch('sys.argv', ['watcher.py', '--backend', 'fanotify']):
+            args = parse_args()
+            assert args.backend == "fanotify"
+
+    def test_parse_args_unknown_backend_exits(self):
+        """Test that an unknown backend is rejected by argparse"""
+        with patch('sys.argv', ['watcher.py', '--backend', 'kqueue']):
+            with pytest.raises(SystemExit):
+                parse_args()
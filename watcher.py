@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-import argparse
 import logging
 import os
+import queue
+import stat
 import sys
+import threading
 import time
-from logging.handlers import RotatingFileHandler
-from processors.file_processor import process_new_file
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from types import SimpleNamespace
+from processors.batch import BatchProcessor
+from processors.event_queue import EventBatch, SettlePoller
+from processors.specialize import build_processor
 
 try:
     from watchdog.observers import Observer
@@ -15,6 +20,20 @@ except Exception:  # watchdog not available
     print("Required package 'watchdog' is not installed. Install with: python -m pip install watchdog")
     sys.exit(1)
 
+# Optional: on Linux, read inotify directly instead of going through watchdog's Observer
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except Exception:  # not installed, or not on Linux
+    INotify = None
+
+
+_DETECTED = "New file detected: %s"
+_DETECTED_INCOMPLETE = "New file detected (may be incomplete): %s"
+
+
+def _no_log(*args, **kwargs) -> None:
+    pass
+
 
 class NewFileHandler(FileSystemEventHandler):
     def __init__(
@@ -23,80 +42,320 @@ class NewFileHandler(FileSystemEventHandler):
         processed_dir: str | None = None,
         settle_seconds: float = 0.5,
         max_tries: int = 10,
+        settle_samples: int = 2,
+        close_events: bool = False,
+        batch: BatchProcessor | None = None,
+        poller: SettlePoller | None = None,
+        dedup: bool = False,
     ) -> None:
         super().__init__()
         self.logger = logger
+        # The level is fixed for a watcher run; resolve it once instead of per log call
+        self._info_enabled = logger.isEnabledFor(logging.INFO)
+        self._info = logger.info if self._info_enabled else _no_log
         self.processed_dir = processed_dir
         self.settle_seconds = settle_seconds
         self.max_tries = max_tries
+        # Number of consecutive equal size readings that count as settled
+        self.settle_samples = max(2, settle_samples)
+        # When the observer reports close-after-write (inotify IN_CLOSE_WRITE),
+        # written files are handled from on_closed and renamed-in files from
+        # on_moved, so the settle poll is skipped.
+        self.close_events = close_events
+        # Optional background mover; when set, processing leaves the event thread
+        self.batch = batch
+        # Optional shared settle poller; when set, on_created returns immediately
+        self.poller = poller
+        # Mover specialised for this processed_dir (dedup drops already-seen content)
+        self._proc = build_processor(processed_dir, dedup=dedup) if processed_dir else None
 
     def on_created(self, event):
         # Ignore directories
         if event.is_directory:
             return
 
-        path = event.src_path
-
-        # Wait for file size to stabilize (basic heuristic to avoid partial-write events)
-        prev_size = -1
-        stable = False
-        for _ in range(self.max_tries):
-            try:
-                size = os.path.getsize(path)
-            except OSError:
-                size = -1
-            if size == prev_size and size != -1:
-                stable = True
-                break
-            prev_size = size
-            time.sleep(self.settle_seconds)
+        # The writer's close will arrive as on_closed; nothing to wait for here
+        if self.close_events:
+            return
+
+        self._settle(event.src_path)
+
+    def on_closed(self, event):
+        if event.is_directory or not self.close_events:
+            return
+
+        # IN_CLOSE_WRITE fires once the producer has closed the file, so it is complete
+        self._complete(event.src_path)
+
+    def on_moved(self, event):
+        # An empty dest_path means the file was moved out of the watched directory
+        if event.is_directory or not event.dest_path:
+            return
 
-        if not stable:
-            # Still log it — better to have the event than miss it entirely
-            self.logger.info("New file detected (may be incomplete): %s", path)
+        # mv, rsync and write-then-rename publish a file with a rename, which
+        # never produces a close event; a rename is atomic, so the file is complete
+        if self.close_events:
+            self._complete(event.dest_path)
         else:
-            self.logger.info("New file detected: %s", path)
+            self._settle(event.dest_path)
+
+    def _settle(self, path: str) -> None:
+        if self.poller:
+            self.poller.add(path)
+            return
+
+        stable = self._wait_for_settle(path)
+        self._handle(path, stable)
+
+    def _complete(self, path: str) -> None:
+        """Handle a file known to be complete (closed after writing, or renamed in)."""
+        # Producers that publish by rename write to a hidden temp name first
+        # (rsync's ".name.XXXXXX"); leave it alone until it gets its final name
+        if os.path.basename(path).startswith("."):
+            return
+        self._handle(path, stable=True)
+
+    def _wait_for_settle(self, path: str) -> bool:
+        # Wait for file size to stabilize (basic heuristic to avoid partial-write events),
+        # using the same settle rule as SettlePoller on a batch of one.
+        batch = EventBatch()
+        batch.add(path)
+        while True:
+            settled, gave_up = batch.poll(self.settle_samples, self.max_tries)
+            if settled or gave_up:
+                return bool(settled)
+            time.sleep(self.settle_seconds)
 
-        # Delegate processing (move/clean) to processors.file_processor
+    def _handle(self, path: str, stable: bool) -> None:
+        # Still log an unstable file — better to have the event than miss it entirely
+        self._info(_DETECTED if stable else _DETECTED_INCOMPLETE, path)
+
+        # Delegate processing (move/clean) to the processors package
         try:
-            if self.processed_dir:
-                dest = process_new_file(path, processed_dir=self.processed_dir, logger=self.logger)
-                self.logger.info("Processed file: %s", dest)
+            if self.processed_dir and self.batch:
+                self.batch.submit(path)
+            elif self.processed_dir:
+                dest = self._proc(path, self.logger if self._info_enabled else None)
+                self._info("Processed file: %s", dest)
             else:
-                self.logger.info("No processed_dir configured; skipping processing for %s", path)
+                self._info("No processed_dir configured; skipping processing for %s", path)
         except Exception:
             self.logger.exception("Error processing file %s", path)
 
 
+def make_observer():
+    """Return watchdog's platform observer, reporting renames into the directory as moves.
+
+    By default the inotify observer turns a file moved in from elsewhere into a
+    created event, which close-event mode would otherwise ignore.
+    """
+    try:
+        from watchdog.observers.inotify import InotifyObserver
+    except Exception:  # not on Linux, or inotify unavailable
+        return Observer()
+    if Observer is InotifyObserver:
+        return InotifyObserver(generate_full_events=True)
+    return Observer()
+
+
+def emits_close_events(observer) -> bool:
+    """Return True if `observer` reports close-after-write events (Linux inotify)."""
+    try:
+        from watchdog.observers.inotify import InotifyObserver
+    except Exception:  # not on Linux, or inotify unavailable
+        return False
+    return isinstance(observer, InotifyObserver)
+
+
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that writes through a large buffer.
+
+    The stock handler flushes after every record and seeks/tells on every
+    rollover check, which drains any buffer. This one tracks the file size
+    itself and leaves flushing to `flush()` (called by FlushingQueueListener
+    when the queue runs dry, on rollover, and on close).
+    """
+
+    buffer_size = 128 * 1024
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode, buffering=self.buffer_size, encoding=self.encoding, errors=self.errors)
+        # See bpo-45401: never roll over anything other than regular files
+        st = os.fstat(stream.fileno())
+        self._rollable = stat.S_ISREG(st.st_mode)
+        self._size = st.st_size
+        return stream
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            # maxBytes is in bytes; only non-ASCII text needs encoding to measure
+            size = len(msg) if msg.isascii() else len(msg.encode(self.stream.encoding, self.stream.errors))
+            if self.maxBytes > 0 and self._rollable and self._size and self._size + size >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(msg)
+            self._size += size
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that renders the asctime date part once per second.
+
+    Same output as logging.Formatter; only the strftime/localtime work is
+    reused for records created within the same second.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._cached: tuple[int, str] = (-1, "")
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, text = self._cached
+        if second != cached_second:
+            text = time.strftime(datefmt or self.default_time_format, self.converter(record.created))
+            self._cached = (second, text)
+        if datefmt or not self.default_msec_format:
+            return text
+        return self.default_msec_format % (text, record.msecs)
+
+
+class FlushingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers whenever the queue runs dry."""
+
+    def dequeue(self, block):
+        if block and self.queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+        return self.queue.get(block)
+
+
+def watch_inotify(watch_path: str, handler: NewFileHandler, stop: threading.Event | None = None) -> None:
+    """Feed IN_CLOSE_WRITE and IN_MOVED_TO events for `watch_path` straight to `handler`.
+
+    Both mean the file is complete: written and closed, or renamed in. One
+    read() returns a whole batch of events, with no observer thread or
+    event-object dispatch in between. Runs until `stop` is set (or forever).
+    """
+    inotify = INotify()
+    try:
+        inotify.add_watch(watch_path, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO)
+        isdir = inotify_flags.ISDIR
+        while stop is None or not stop.is_set():
+            for event in inotify.read(timeout=1000):
+                # Overflow and watch-removal events carry no file name
+                if event.name and not event.mask & isdir:
+                    handler._complete(os.path.join(watch_path, event.name))
+    finally:
+        inotify.close()
+
+
+def watch_fanotify(source, handler: NewFileHandler, stop: threading.Event | None = None) -> None:
+    """Feed completed files reported by a FanotifySource to `handler` until `stop` is set.
+
+    Only close-after-write is reported; files renamed into the directory are not.
+    """
+    while stop is None or not stop.is_set():
+        for path in source.read(timeout=1.0):
+            handler._complete(path)
+
+
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
 def setup_logger(logfile: str) -> logging.Logger:
+    # The format below needs none of the thread/process/caller fields; skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging._srcfile = None
+
     logger = logging.getLogger("folder_watcher")
     logger.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+    formatter = CachedTimeFormatter("%(asctime)s %(levelname)s %(message)s")
 
     # Rotating file handler to avoid unbounded log growth
-    handler = RotatingFileHandler(logfile, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8")
+    handler = BufferedRotatingFileHandler(logfile, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8")
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
     # Also log to console for immediate feedback
     console = logging.StreamHandler()
     console.setFormatter(formatter)
-    logger.addHandler(console)
+
+    # File and console writes happen on the listener thread; callers only enqueue records
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = FlushingQueueListener(log_queue, handler, console, respect_handler_level=True)
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.listener = listener
+    logger.addHandler(queue_handler)
+    listener.start()
 
     return logger
 
 
+def stop_logger(logger: logging.Logger) -> None:
+    """Flush queued records and close the handlers attached by setup_logger."""
+    for handler in logger.handlers[:]:
+        listener = getattr(handler, "listener", None)
+        if listener is not None:
+            listener.stop()
+            for target in listener.handlers:
+                target.close()
+        handler.close()
+        logger.removeHandler(handler)
+
+
 # Edit these defaults as needed (Windows paths)
 DEFAULT_WATCH_PATH = r"D:\Data Engineering\Data\DataIn"
 DEFAULT_LOG_DIR = r"D:\Data Engineering\Data\Logs"
 DEFAULT_PROCESSED_DIR = r"D:\Data Engineering\Data\Processed"
 
 
-def parse_args() -> argparse.Namespace:
+BACKENDS = ("auto", "watchdog", "inotify", "fanotify")
+
+
+def _backend(value: str) -> str:
+    if value not in BACKENDS:
+        raise ValueError(value)
+    return value
+
+
+# Option table for the fast command-line scan: flag -> (attribute, converter or None for switches)
+_OPTIONS = {
+    "--path": ("path", str), "-p": ("path", str),
+    "--logdir": ("logdir", str), "-l": ("logdir", str),
+    "--processed": ("processed", str), "-d": ("processed", str),
+    "--settle": ("settle", float),
+    "--tries": ("tries", int),
+    "--samples": ("samples", int),
+    "--dedup": ("dedup", None),
+    "--backend": ("backend", _backend),
+}
+
+_DEFAULTS = {
+    "path": DEFAULT_WATCH_PATH,
+    "logdir": DEFAULT_LOG_DIR,
+    "processed": DEFAULT_PROCESSED_DIR,
+    "settle": 0.5,
+    "tries": 10,
+    "samples": 2,
+    "dedup": False,
+    "backend": "auto",
+}
+
+
+def _build_parser():
+    # Imported lazily: only --help, errors and unusual spellings need argparse
+    import argparse
+
     parser = argparse.ArgumentParser(description="Watch a folder for new files and log events")
     parser.add_argument(
         "--path", "-p",
@@ -113,9 +372,114 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_PROCESSED_DIR,
         help=f"Directory to move processed files to (default {DEFAULT_PROCESSED_DIR})"
     )
-    parser.add_argument("--settle", type=float, default=0.5, help="Seconds to wait between file-size checks for settle heuristic")
-    parser.add_argument("--tries", type=int, default=10, help="Number of settle checks before giving up")
-    return parser.parse_args()
+    parser.add_argument("--settle", type=float, default=_DEFAULTS["settle"], help="Seconds to wait between file-size checks for settle heuristic")
+    parser.add_argument("--tries", type=int, default=_DEFAULTS["tries"], help="Number of settle checks before giving up")
+    parser.add_argument("--samples", type=int, default=_DEFAULTS["samples"], help="Consecutive equal file sizes required to consider a file settled")
+    parser.add_argument("--dedup", action="store_true", help="Remove incoming files whose content matches an already processed file")
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default=_DEFAULTS["backend"],
+        help="Event source: auto (inotify on Linux if available, else watchdog), watchdog, inotify, "
+             "or fanotify (Linux, needs CAP_SYS_ADMIN; misses files renamed into the directory)"
+    )
+    return parser
+
+
+def parse_args(argv: list[str] | None = None) -> SimpleNamespace:
+    """Parse command-line options.
+
+    Plain `--flag value` / `--flag=value` forms are scanned directly. Anything
+    else (--help, unknown or abbreviated flags, bad values) goes to the full
+    argparse parser, so errors and help output are unchanged.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    values = dict(_DEFAULTS)
+    tokens = iter(argv)
+    for token in tokens:
+        flag, eq, raw = token.partition("=") if token.startswith("--") else (token, "", "")
+        spec = _OPTIONS.get(flag)
+        if spec is None:
+            break
+        dest, convert = spec
+        if convert is None:
+            # On/off switch; "--dedup=x" is left to argparse to reject
+            if eq:
+                break
+            values[dest] = True
+            continue
+        if not eq:
+            raw = next(tokens, None)
+            if raw is None or raw.startswith("-"):
+                break
+        try:
+            values[dest] = convert(raw)
+        except ValueError:
+            break
+    else:
+        return SimpleNamespace(**values)
+
+    return SimpleNamespace(**vars(_build_parser().parse_args(argv)))
+
+
+def run_inotify(watch_path: str, logger: logging.Logger, handler_options: dict) -> None:
+    """Watch `watch_path` with native inotify until interrupted."""
+    logger.info("Using native inotify backend")
+    event_handler = NewFileHandler(logger, close_events=True, **handler_options)
+    try:
+        watch_inotify(watch_path, event_handler)
+    except KeyboardInterrupt:
+        logger.info("Shutdown requested, stopping watcher")
+
+
+def run_fanotify(watch_path: str, logger: logging.Logger, handler_options: dict) -> bool:
+    """Watch `watch_path` with fanotify until interrupted; return False if fanotify is unusable."""
+    from processors.fanotify_source import FanotifySource
+
+    try:
+        source = FanotifySource(watch_path)
+    except OSError as exc:
+        logger.error("fanotify backend unavailable (requires Linux and CAP_SYS_ADMIN): %s", exc)
+        return False
+
+    logger.info("Using fanotify backend")
+    event_handler = NewFileHandler(logger, close_events=True, **handler_options)
+    try:
+        watch_fanotify(source, event_handler)
+    except KeyboardInterrupt:
+        logger.info("Shutdown requested, stopping watcher")
+    finally:
+        source.close()
+    return True
+
+
+def run_observer(watch_path: str, logger: logging.Logger, handler_options: dict) -> None:
+    """Watch `watch_path` with watchdog's Observer until interrupted."""
+    observer = make_observer()
+    close_events = emits_close_events(observer)
+    event_handler = NewFileHandler(logger, close_events=close_events, **handler_options)
+    if not close_events:
+        logger.info("Close events unavailable; using settle heuristic")
+        event_handler.poller = SettlePoller(
+            event_handler._handle,
+            settle_seconds=event_handler.settle_seconds,
+            max_tries=event_handler.max_tries,
+            settle_samples=event_handler.settle_samples,
+        )
+    observer.schedule(event_handler, watch_path, recursive=False)
+    observer.start()
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Shutdown requested, stopping observer")
+        observer.stop()
+    observer.join()
+    if event_handler.poller:
+        event_handler.poller.close()
 
 
 def main() -> int:
@@ -137,20 +501,39 @@ def main() -> int:
     logger.info("Logging to: %s", logfile)
     logger.info("Processed dir: %s", processed_dir)
 
-    event_handler = NewFileHandler(logger, processed_dir=processed_dir, settle_seconds=args.settle, max_tries=args.tries)
-    observer = Observer()
-    observer.schedule(event_handler, watch_path, recursive=False)
-    observer.start()
+    if args.dedup:
+        logger.info("Duplicate detection enabled")
+    batch = BatchProcessor(processed_dir, logger=logger, dedup=args.dedup)
+    handler_options = dict(
+        processed_dir=processed_dir,
+        settle_seconds=args.settle,
+        max_tries=args.tries,
+        settle_samples=args.samples,
+        batch=batch,
+        dedup=args.dedup,
+    )
 
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("Shutdown requested, stopping observer")
-        observer.stop()
-    observer.join()
+    status = 0
+    backend = args.backend
+    if backend == "auto":
+        backend = "inotify" if INotify is not None and sys.platform.startswith("linux") else "watchdog"
+
+    if backend == "fanotify":
+        if not run_fanotify(watch_path, logger, handler_options):
+            status = 1
+    elif backend == "inotify":
+        if INotify is None:
+            logger.error("inotify backend requires the 'inotify_simple' package on Linux")
+            status = 1
+        else:
+            run_inotify(watch_path, logger, handler_options)
+    else:
+        run_observer(watch_path, logger, handler_options)
+
+    batch.close()
     logger.info("Stopped")
-    return 0
+    stop_logger(logger)
+    return status
 
 
 if __name__ == "__main__":